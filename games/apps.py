@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class GamesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'games'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_delete, post_save
+        from .caching import user_changed
+
+        post_save.connect(user_changed, sender=User, dispatch_uid="games_user_saved")
+        post_delete.connect(user_changed, sender=User, dispatch_uid="games_user_deleted")
@@ -0,0 +1,150 @@
+"""
+Read-through cache for users and game metadata.
+
+Reads go to the local-memory cache first, then to the "shared" cache if
+one is configured, and only then to Postgres. User and game keys include
+a version number, kept in the shared cache when there is one, that is
+bumped on every change. Stale entries in any worker's local tier are then
+simply never read again and age out of the LRU.
+"""
+
+import logging
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from .models import Game
+
+logger = logging.getLogger(__name__)
+
+USER_TIMEOUT = 300
+GAME_TIMEOUT = 60
+CACHE_STATS_INTERVAL = 300
+# Solo lo que usan la autenticación y los permisos: nunca la contraseña
+USER_FIELDS = ("id", "username", "is_active", "is_staff", "is_superuser")
+
+stats = Counter()
+
+
+def local_cache():
+    return caches["default"]
+
+
+def shared_cache():
+    return caches["shared"] if "shared" in settings.CACHES else None
+
+
+def cache_stats():
+    lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_rate": (lookups - stats["misses"]) / lookups if lookups else 0.0,
+    }
+
+
+def log_cache_stats():
+    # Los contadores son por proceso: cada worker registra los suyos
+    logger.info(f"Cache stats: {cache_stats()}")
+
+
+def user_version_key(field, value):
+    return f"user:{field}:{value}:version"
+
+
+def user_key(field, value, version):
+    return f"user:{field}:{value}:v{version}"
+
+
+def game_version_key(game_id):
+    return f"game:{game_id}:version"
+
+
+def game_key(game_id, version):
+    return f"game:{game_id}:v{version}"
+
+
+def read_through(key, loader, timeout):
+    local = local_cache()
+    value = local.get(key)
+    if value is not None:
+        stats["local_hits"] += 1
+        return value
+
+    shared = shared_cache()
+    if shared is not None:
+        value = shared.get(key)
+        if value is not None:
+            stats["shared_hits"] += 1
+            local.set(key, value, timeout)
+            return value
+
+    stats["misses"] += 1
+    value = loader()
+    if value is not None:
+        local.set(key, value, timeout)
+        if shared is not None:
+            shared.set(key, value, timeout)
+    return value
+
+
+def get_version(key):
+    # Con caché compartida la versión vive ahí, para verla igual en todos los workers
+    return (shared_cache() or local_cache()).get(key, 1)
+
+
+def bump_version(key):
+    cache = shared_cache() or local_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def user_lookup_fields():
+    # Los tokens pueden identificar al usuario por otro campo que el id
+    return {"id", getattr(settings, "SIMPLE_JWT", {}).get("USER_ID_FIELD", "id")}
+
+
+def get_user(value, field="id"):
+    """User looked up by ``field``, with only USER_FIELDS loaded."""
+    version = get_version(user_version_key(field, value))
+    values = read_through(
+        user_key(field, value, version),
+        lambda: User.objects.filter(**{field: value}).values(*USER_FIELDS).first(),
+        USER_TIMEOUT,
+    )
+    if values is None:
+        return None
+    # El resto de los campos queda diferido y se lee de la base si se pide;
+    # from_db espera los valores en el orden de los campos del modelo
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def invalidate_user(user):
+    for field in user_lookup_fields():
+        bump_version(user_version_key(field, getattr(user, field)))
+
+
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance)
+
+
+def game_version(game_id):
+    return get_version(game_version_key(game_id))
+
+
+def get_game_meta(game_id):
+    return read_through(
+        game_key(game_id, game_version(game_id)),
+        lambda: Game.objects.filter(id=game_id)
+        .values("id", "status", "created_at", "pattern_set", "winner__username")
+        .first(),
+        GAME_TIMEOUT,
+    )
+
+
+def invalidate_game(game_id):
+    bump_version(game_version_key(game_id))
+
@@ -1,24 +1,34 @@
 import json
-import random
-import asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth.models import User
 from django.utils import timezone
 from .models import Game, PlayerCard
+from .caching import get_game_meta, invalidate_game
+from .events import encoded_event
+from .sharding import get_coordinator
+from .lobby import (
+    LOBBY_WAIT_SECONDS,
+    MIN_PLAYERS,
+    get_lobby_snapshot,
+    invalidate_lobby,
+)
+from .teardown import ENDED_STATUSES, GAME_OVER_CLOSE_CODE, build_game_summary
+from .patterns import DEFAULT_PATTERN_SET, is_win, marked_mask
+from .roster import load_players, roster_registry
+from .session import ConnectionSession
+from .tournaments import record_room_result
 from rest_framework_simplejwt.tokens import AccessToken
-from django.core.exceptions import ObjectDoesNotExist
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class BingoConsumer(AsyncWebsocketConsumer):
+    session = None
+
     async def connect(self):
         try:
-            self.game_id = self.scope["url_route"]["kwargs"]["game_id"]
-            self.game_group_name = f"game_{self.game_id}"
-            self.number_generator_task = None
+            game_id = self.scope["url_route"]["kwargs"]["game_id"]
 
             query_string = self.scope["query_string"].decode()
             params = dict(x.split("=") for x in query_string.split("&") if "=" in x)
@@ -32,17 +42,34 @@ class BingoConsumer(AsyncWebsocketConsumer):
             try:
                 access_token = AccessToken(token)
                 user_id = access_token["user_id"]
-                self.user = await self.get_user(user_id)
+                card, players = await self.load_connection(user_id, game_id)
 
-                if not self.user:
-                    logger.error(f"User not found for ID: {user_id}")
-                    await self.close()
+                if card and card["game__status"] in ENDED_STATUSES:
+                    # El juego ya terminó: resumen y cierre, sin unirse al grupo
+                    await self.send_game_over(game_id)
                     return
 
-                game_state = await self.get_game_state()
+                game_state = None
+                if card:
+                    roster = await roster_registry.get(game_id, players)
+                    game_state = self.get_game_state(card, roster)
                 if game_state:
+                    player_card = game_state["player_card"]
+                    # Solo se guardan ids y el cartón, no el User ni el Game
+                    self.session = ConnectionSession(
+                        user_id,
+                        card["user__username"],
+                        game_id,
+                        player_card["id"],
+                        player_card["card_numbers"],
+                        player_card["selected_numbers"],
+                    )
+                    await get_coordinator().ensure_started(self.channel_layer)
+                    await self.channel_layer.group_add(
+                        self.session.group_name, self.channel_name
+                    )
                     await self.channel_layer.group_add(
-                        self.game_group_name, self.channel_name
+                        self.session.card_group_name, self.channel_name
                     )
 
                     await self.accept()
@@ -52,27 +79,25 @@ class BingoConsumer(AsyncWebsocketConsumer):
                             {
                                 "type": "game_state",
                                 "state": game_state["state"],
-                                "player_card": game_state["player_card"],
+                                "player_card": player_card,
                             }
                         )
                     )
 
-                    game = await self.get_game(self.game_id)
-                    if game.status == "waiting":
+                    if card["game__status"] == "waiting":
                         time_elapsed = (
-                            timezone.now() - game.created_at
+                            timezone.now() - card["game__created_at"]
                         ).total_seconds()
-                        if time_elapsed > 60:
-                            player_count = await self.get_player_count(self.game_id)
-                            if player_count >= 3:
+                        if time_elapsed > LOBBY_WAIT_SECONDS:
+                            player_count = await self.get_player_count(game_id)
+                            if player_count >= MIN_PLAYERS:
                                 await self.start_game()
 
-                    await self.channel_layer.group_send(
-                        self.game_group_name,
-                        {"type": "player_joined", "player": self.user.username},
+                    await roster_registry.join(
+                        self.session.game_id, self.session.username, self.channel_layer
                     )
                 else:
-                    logger.error("Could not get game state")
+                    logger.error(f"No card for user {user_id} in game {game_id}")
                     await self.close()
 
             except Exception as e:
@@ -85,127 +110,85 @@ class BingoConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_player_count(self, game_id):
-        return (
-            PlayerCard.objects.filter(game_id=game_id).values("user").distinct().count()
-        )
+        # El roster en memoria solo conoce a quienes pasaron por este worker
+        snapshot = get_lobby_snapshot(game_id)
+        return snapshot["player_count"] if snapshot else 0
 
-    async def start_game(self):
-        game = await self.get_game(self.game_id)
-        if game.status == "waiting":
-            await self.update_game_status("playing")
-            # Start number generator
-            self.number_generator_task = asyncio.create_task(self.generate_numbers())
-            # Notify all players that the game is starting
-            await self.channel_layer.group_send(
-                self.game_group_name,
-                {"type": "game_starting", "message": "El juego está comenzando"},
-            )
+    async def send_game_over(self, game_id):
+        summary = await build_game_summary(game_id)
+        await self.accept()
+        await self.send(text_data=json.dumps({"type": "game_over", "summary": summary}))
+        await self.close(code=GAME_OVER_CLOSE_CODE)
 
-    @database_sync_to_async
-    def update_game_status(self, status):
-        game = Game.objects.get(id=self.game_id)
-        game.status = status
-        game.save()
-
-    async def game_starting(self, event):
-        await self.send(
-            text_data=json.dumps({"type": "game_starting", "message": event["message"]})
-        )
+    async def start_game(self):
+        # El worker dueño del juego es el único que corre el sorteo
+        await get_coordinator().route_start_game(self.session.game_id)
 
     async def disconnect(self, close_code):
+        session = self.session
+        if session is None:
+            return
         try:
-            if hasattr(self, "number_generator_task") and self.number_generator_task:
-                self.number_generator_task.cancel()
-            if hasattr(self, "game_group_name"):
-                await self.channel_layer.group_discard(
-                    self.game_group_name, self.channel_name
-                )
+            await self.channel_layer.group_discard(
+                session.group_name, self.channel_name
+            )
+            await self.channel_layer.group_discard(
+                session.card_group_name, self.channel_name
+            )
+            await roster_registry.leave(
+                session.game_id, session.username, self.channel_layer
+            )
         except Exception as e:
             logger.error(f"Disconnect error: {str(e)}")
+        self.session = None
 
     @database_sync_to_async
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
-
-    @database_sync_to_async
-    def get_game(self, game_id):
-        try:
-            return Game.objects.get(id=game_id)
-        except Game.DoesNotExist:
-            return None
-
-    @database_sync_to_async
-    def get_game_state(self):
-        try:
-            game = Game.objects.get(id=self.game_id)
-            player_card = PlayerCard.objects.get(user=self.user, game=game)
-
-            return {
-                "state": {
-                    "status": game.status,
-                    "currentNumber": game.current_number,
-                    "drawnNumbers": game.drawn_numbers,
-                    "winner": game.winner.username if game.winner else None,
-                    "players": [
-                        {
-                            "username": pc.user.username,
-                            "is_disqualified": pc.is_disqualified,
-                        }
-                        for pc in PlayerCard.objects.filter(game=game)
-                    ],
-                },
-                "player_card": {
-                    "id": player_card.id,
-                    "card_numbers": player_card.card_numbers,
-                    "selected_numbers": player_card.selected_numbers,
-                    "is_winner": player_card.is_winner,
-                },
-            }
-        except (Game.DoesNotExist, PlayerCard.DoesNotExist):
-            return None
-
-    async def generate_numbers(self):
-        try:
-            game = await self.get_game(self.game_id)
-            available_numbers = set(range(1, 76)) - set(game.drawn_numbers)
-
-            while game.status == "playing" and available_numbers:
-                await asyncio.sleep(5)
-
-                number = random.choice(list(available_numbers))
-                available_numbers.remove(number)
-
-                game.drawn_numbers.append(number)
-                game.current_number = number
-                await self.update_game(game)
-
-                await self.channel_layer.group_send(
-                    self.game_group_name, {"type": "number_drawn", "number": number}
-                )
-
-                game = await self.get_game(self.game_id)
-                if game.status != "playing":
-                    break
-
-        except Exception as e:
-            logger.error(f"Error generating numbers: {str(e)}")
-
-    @database_sync_to_async
-    def update_game(self, game):
-        game.save()
-
-    async def disconnect(self, close_code):
-        try:
-            if self.number_generator_task:
-                self.number_generator_task.cancel()
-            await self.channel_layer.group_discard(
-                self.game_group_name, self.channel_name
+    def load_connection(self, user_id, game_id):
+        """Card, username and game state for a new socket, in one query."""
+        # Sin cartón no hay conexión, así que el join del cartón con el usuario
+        # y el juego reemplaza las lecturas separadas de cada uno
+        card = (
+            PlayerCard.objects.filter(user_id=user_id, game_id=game_id)
+            .values(
+                "id",
+                "card_numbers",
+                "selected_numbers",
+                "is_winner",
+                "user__username",
+                "game__status",
+                "game__created_at",
+                "game__winner__username",
+                "game__drawn_numbers",
+                "game__current_number",
             )
-        except:
-            pass
+            .first()
+        )
+        # El roster se carga una vez por juego y worker, no por conexión
+        players = None
+        if (
+            card
+            and card["game__status"] not in ENDED_STATUSES
+            and not roster_registry.is_loaded(game_id)
+        ):
+            players = load_players(game_id)
+        return card, players
+
+    def get_game_state(self, card, roster):
+        return {
+            "state": {
+                "status": card["game__status"],
+                "currentNumber": card["game__current_number"],
+                "drawnNumbers": card["game__drawn_numbers"],
+                "winner": card["game__winner__username"],
+                "players": roster.as_list(),
+            },
+            "player_card": {
+                "id": card["id"],
+                "card_numbers": card["card_numbers"],
+                "selected_numbers": card["selected_numbers"],
+                "is_winner": card["is_winner"],
+            },
+        }
 
     async def receive(self, text_data):
         try:
@@ -225,40 +208,48 @@ class BingoConsumer(AsyncWebsocketConsumer):
                 )
             elif action == "claim_bingo":
                 is_winner = await self.verify_bingo()
-                if is_winner:
-                    await self.channel_layer.group_send(
-                        self.game_group_name,
-                        {
-                            "type": "bingo_claimed",
-                            "success": True,
-                            "player": self.user.username,
-                        },
+                if is_winner is None:
+                    # Solo se avisa a quien reclamó; no hay trampa que castigar
+                    await self.send(
+                        text_data=json.dumps(
+                            {"type": "bingo_claimed", "success": False, "late": True}
+                        )
                     )
-                else:
+                    return
+                if not is_winner:
                     await self.disqualify_player()
-                    await self.channel_layer.group_send(
-                        self.game_group_name,
-                        {
-                            "type": "bingo_claimed",
-                            "success": False,
-                            "player": self.user.username,
-                        },
-                    )
+                await self.channel_layer.group_send(
+                    self.session.group_name,
+                    encoded_event(
+                        "bingo_claimed",
+                        success=is_winner,
+                        player=self.session.username,
+                    ),
+                )
+                if is_winner:
+                    await get_coordinator().route_end_game(self.session.game_id)
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
 
+    async def select_number(self, number):
+        session = self.session
+        selected = await self.save_selection(session.game_id, session.card_id, number)
+        if selected:
+            session.mark(number)
+        return selected
+
     @database_sync_to_async
-    def select_number(self, number):
+    def save_selection(self, game_id, card_id, number):
         try:
-            game = Game.objects.get(id=self.game_id)
-            player_card = PlayerCard.objects.get(user=self.user, game=game)
+            game = Game.objects.get(id=game_id)
+            player_card = PlayerCard.objects.get(id=card_id)
 
             if (
                 number in game.drawn_numbers
                 and number not in player_card.selected_numbers
             ):
                 player_card.selected_numbers.append(number)
-                player_card.save()
+                player_card.save(update_fields=["selected_numbers"])
                 return True
             return False
         except (Game.DoesNotExist, PlayerCard.DoesNotExist):
@@ -266,73 +257,73 @@ class BingoConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def verify_bingo(self):
-        try:
-            game = Game.objects.get(id=self.game_id)
-            player_card = PlayerCard.objects.get(user=self.user, game=game)
-
-            if self.check_win_condition(
-                player_card.card_numbers, player_card.selected_numbers
-            ):
-                game.status = "finished"
-                game.winner = self.user
-                game.save()
-
-                player_card.is_winner = True
-                player_card.save()
-                return True
-            return False
-        except (Game.DoesNotExist, PlayerCard.DoesNotExist):
+        """True if the claim wins, False if invalid, None if the game already ended."""
+        session = self.session
+        game = get_game_meta(session.game_id)
+        if game is None:
             return False
 
-    def check_win_condition(self, card_numbers, selected_numbers):
-        selected_set = set(selected_numbers)
-        selected_set.add(0)  # Añadir el comodín al conjunto de números seleccionados
-
-        # Verificar filas
-        for row in card_numbers:
-            if all(num in selected_set for num in row):
-                return True
-
-        # Verificar columnas
-        for col in range(5):
-            if all(card_numbers[row][col] in selected_set for row in range(5)):
-                return True
-
-        # Verificar diagonales
-        if all(card_numbers[i][i] in selected_set for i in range(5)):
-            return True
-        if all(card_numbers[i][4 - i] in selected_set for i in range(5)):
-            return True
+        # La máscara en memoria evita leer el cartón; si no alcanza (p. ej.
+        # números marcados desde otro socket) se revisa contra la base de datos
+        won = is_win(session.mask, game["pattern_set"])
+        if not won:
+            selected_numbers = (
+                PlayerCard.objects.filter(id=session.card_id)
+                .values_list("selected_numbers", flat=True)
+                .first()
+            )
+            won = selected_numbers is not None and self.check_win_condition(
+                session.card_numbers, selected_numbers, game["pattern_set"]
+            )
 
-        # Verificar las cuatro esquinas
-        corners = [
-            card_numbers[0][0],  # Esquina superior izquierda
-            card_numbers[0][4],  # Esquina superior derecha
-            card_numbers[4][0],  # Esquina inferior izquierda
-            card_numbers[4][4],  # Esquina inferior derecha
-        ]
-        if all(corner in selected_set for corner in corners):
+        if won:
+            updated = (
+                Game.objects.filter(id=session.game_id)
+                .exclude(status="finished")
+                .update(status="finished", winner_id=session.user_id)
+            )
+            if not updated:
+                # Otro jugador ganó primero: el reclamo es válido pero tardío
+                return None
+            invalidate_lobby(session.game_id)
+            invalidate_game(session.game_id)
+            record_room_result(session.game_id, session.user_id)
+
+            PlayerCard.objects.filter(id=session.card_id).update(is_winner=True)
             return True
-
         return False
 
+    def check_win_condition(
+        self, card_numbers, selected_numbers, pattern_set=DEFAULT_PATTERN_SET
+    ):
+        # El comodín (0) siempre cuenta como marcado
+        return is_win(marked_mask(card_numbers, selected_numbers), pattern_set)
+
     @database_sync_to_async
-    def disqualify_player(self):
-        try:
-            player_card = PlayerCard.objects.get(user=self.user, game_id=self.game_id)
-            player_card.is_disqualified = True
-            player_card.save()
-        except PlayerCard.DoesNotExist:
-            pass
+    def save_disqualification(self, card_id):
+        PlayerCard.objects.filter(id=card_id).update(is_disqualified=True)
+
+    async def disqualify_player(self):
+        session = self.session
+        await self.save_disqualification(session.card_id)
+        await roster_registry.disqualify(
+            session.game_id, session.username, self.channel_layer
+        )
 
-    async def number_drawn(self, event):
-        await self.send(text_data=json.dumps(event))
+    async def send_encoded(self, event):
+        # El texto ya viene serializado desde quien hizo el group_send
+        await self.send(text_data=event["text"])
 
-    async def bingo_claimed(self, event):
-        await self.send(text_data=json.dumps(event))
+    number_drawn = send_encoded
+    bingo_claimed = send_encoded
+    lobby_status = send_encoded
+    game_starting = send_encoded
+    win_hint = send_encoded
 
-    async def player_joined(self, event):
-        await self.send(text_data=json.dumps(event))
+    async def roster_diff(self, event):
+        roster_registry.apply(self.session.game_id, event)
+        await self.send(text_data=event["text"])
 
-    async def game_starting(self, event):
-        await self.send(text_data=json.dumps(event))
+    async def game_over(self, event):
+        await self.send(text_data=event["text"])
+        await self.close(code=GAME_OVER_CLOSE_CODE)
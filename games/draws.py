@@ -0,0 +1,130 @@
+import asyncio
+import random
+import logging
+from channels.db import database_sync_to_async
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.models import F, Func, Value
+from .caching import invalidate_game
+from .events import encoded_event
+from .lobby import invalidate_lobby
+from .models import Game, PlayerCard
+from .patterns import DrawEvaluator
+from .session import card_group_name
+
+logger = logging.getLogger(__name__)
+
+DRAW_INTERVAL = 5
+BINGO_NUMBERS = range(1, 76)
+
+
+def array_append(field, number):
+    return Func(
+        F(field),
+        Value(number),
+        function="array_append",
+        output_field=ArrayField(models.IntegerField()),
+    )
+
+
+@database_sync_to_async
+def get_game(game_id):
+    try:
+        return Game.objects.get(id=game_id)
+    except Game.DoesNotExist:
+        return None
+
+
+@database_sync_to_async
+def mark_game_playing(game_id):
+    # Solo un proceso puede pasar el juego de "waiting" a "playing"
+    updated = Game.objects.filter(id=game_id, status="waiting").update(
+        status="playing"
+    )
+    invalidate_lobby(game_id)
+    invalidate_game(game_id)
+    return updated == 1
+
+
+@database_sync_to_async
+def finish_exhausted_game(game_id):
+    # Se acabaron los números sin ganador: el juego termina
+    updated = Game.objects.filter(id=game_id, status="playing").update(
+        status="finished"
+    )
+    invalidate_lobby(game_id)
+    invalidate_game(game_id)
+    return updated == 1
+
+
+@database_sync_to_async
+def save_draw(game_id, number):
+    """Append the new number and return the game's current status."""
+    # Se agrega en la base en vez de reescribir la lista: un dueño viejo no
+    # puede pisar los números del nuevo. Tampoco se toca el estado, que
+    # verify_bingo puede haber cambiado
+    Game.objects.filter(id=game_id, status="playing").exclude(
+        drawn_numbers__contains=[number]
+    ).update(
+        drawn_numbers=array_append("drawn_numbers", number), current_number=number
+    )
+    return Game.objects.filter(id=game_id).values_list("status", flat=True).first()
+
+
+@database_sync_to_async
+def load_cards(game_id):
+    return dict(
+        PlayerCard.objects.filter(game_id=game_id).values_list("id", "card_numbers")
+    )
+
+
+async def build_evaluator(game):
+    cards = await load_cards(game.id)
+    evaluator = DrawEvaluator(cards, game.pattern_set)
+    for number in game.drawn_numbers:
+        evaluator.draw(number)
+    return evaluator
+
+
+async def run_draw_loop(game_id, channel_layer, interval=DRAW_INTERVAL):
+    """Draw numbers until the game ends; returns True if they ran out."""
+    group_name = f"game_{game_id}"
+    try:
+        game = await get_game(game_id)
+        if not game:
+            return False
+        status = game.status
+        available_numbers = set(BINGO_NUMBERS) - set(game.drawn_numbers)
+        evaluator = await build_evaluator(game)
+
+        while status == "playing" and available_numbers:
+            await asyncio.sleep(interval)
+
+            number = random.choice(list(available_numbers))
+            available_numbers.remove(number)
+
+            status = await save_draw(game_id, number)
+
+            await channel_layer.group_send(
+                group_name, encoded_event("number_drawn", number=number)
+            )
+
+            # Pistas de "cuánto falta" solo para los cartones que cambiaron,
+            # cada una a su propio cartón
+            for card_id, remaining in evaluator.draw(number).items():
+                await channel_layer.group_send(
+                    card_group_name(card_id),
+                    encoded_event("win_hint", remaining=remaining),
+                )
+
+            if status != "playing":
+                break
+
+        if status == "playing" and not available_numbers:
+            return await finish_exhausted_game(game_id)
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating numbers: {str(e)}")
+    return False
@@ -0,0 +1,13 @@
+import json
+
+
+def encoded_event(event_type, **payload):
+    """
+    Group message that carries its JSON text already encoded, so a
+    broadcast to N sockets serializes once instead of N times. Only the
+    text travels: the payload is not repeated next to it.
+    """
+    return {
+        "type": event_type,
+        "text": json.dumps({"type": event_type, **payload}),
+    }
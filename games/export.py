@@ -0,0 +1,128 @@
+import csv
+import datetime
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from games.models import Game, PlayerCard
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CHUNK_SIZE = 2000
+
+# Campos propios de PlayerCard: van por nombre, un alias con el mismo nombre
+# choca con el campo del modelo
+EXPORT_MODEL_FIELDS = (
+    "game_id",
+    "user_id",
+    "card_numbers",
+    "selected_numbers",
+    "is_winner",
+    "is_disqualified",
+)
+EXPORT_ALIASES = {
+    "card_id": F("id"),
+    "game_status": F("game__status"),
+    "game_created_at": F("game__created_at"),
+    "winner_id": F("game__winner_id"),
+    "drawn_numbers": F("game__drawn_numbers"),
+    "username": F("user__username"),
+}
+# Orden de las columnas en la salida
+EXPORT_COLUMNS = (
+    "card_id",
+    "game_id",
+    "game_status",
+    "game_created_at",
+    "winner_id",
+    "drawn_numbers",
+    "user_id",
+    "username",
+    "card_numbers",
+    "selected_numbers",
+    "is_winner",
+    "is_disqualified",
+)
+
+
+def parse_export_date(value, end_of_day=False):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.datetime.combine(
+            day, datetime.time.max if end_of_day else datetime.time.min
+        )
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_export_filters(status=None, since=None, until=None):
+    valid_statuses = {choice for choice, _ in Game.STATUS_CHOICES}
+    if status and status not in valid_statuses:
+        raise ValueError(f"Invalid status: {status}")
+    return {
+        "status": status or None,
+        "since": parse_export_date(since),
+        "until": parse_export_date(until, end_of_day=True),
+    }
+
+
+def export_queryset(status=None, since=None, until=None):
+    queryset = PlayerCard.objects.all()
+    if status:
+        queryset = queryset.filter(game__status=status)
+    if since:
+        queryset = queryset.filter(game__created_at__gte=since)
+    if until:
+        queryset = queryset.filter(game__created_at__lte=until)
+    return queryset.order_by("game_id", "id").values(
+        *EXPORT_MODEL_FIELDS, **EXPORT_ALIASES
+    )
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def format_row(row, fmt, writer=None):
+    if fmt == "ndjson":
+        return (
+            json.dumps(
+                {column: row[column] for column in EXPORT_COLUMNS},
+                cls=DjangoJSONEncoder,
+            )
+            + "\n"
+        )
+    return writer.writerow(
+        [
+            json.dumps(row[column]) if isinstance(row[column], list) else row[column]
+            for column in EXPORT_COLUMNS
+        ]
+    )
+
+
+def csv_writer():
+    return csv.writer(Echo())
+
+
+def iter_export(queryset, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    # iterator() usa cursores del lado del servidor en Postgres
+    writer = csv_writer()
+    if fmt == "csv":
+        yield writer.writerow(EXPORT_COLUMNS)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield format_row(row, fmt, writer)
+
+
+async def aiter_export(queryset, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv_writer()
+    if fmt == "csv":
+        yield writer.writerow(EXPORT_COLUMNS)
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        yield format_row(row, fmt, writer)
@@ -0,0 +1,67 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from games.events import encoded_event
+from games.models import Game
+
+LOBBY_WAIT_SECONDS = 60
+MIN_PLAYERS = 3
+LOBBY_CACHE_TIMEOUT = 2
+
+
+def lobby_cache_key(game_id):
+    return f"lobby_{game_id}"
+
+
+def build_lobby_snapshot(game_id):
+    return (
+        Game.objects.filter(id=game_id)
+        .annotate(player_count=Count("playercard__user", distinct=True))
+        .values("id", "status", "created_at", "player_count")
+        .first()
+    )
+
+
+def get_lobby_snapshot(game_id):
+    key = lobby_cache_key(game_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_lobby_snapshot(game_id)
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, LOBBY_CACHE_TIMEOUT)
+
+    # El tiempo restante se calcula en cada lectura para no servirlo viejo
+    elapsed = (timezone.now() - snapshot["created_at"]).total_seconds()
+    return {
+        "id": snapshot["id"],
+        "status": snapshot["status"],
+        "player_count": snapshot["player_count"],
+        "min_players": MIN_PLAYERS,
+        "time_to_start": (
+            max(0, round(LOBBY_WAIT_SECONDS - elapsed))
+            if snapshot["status"] == "waiting"
+            else 0
+        ),
+        "created_at": snapshot["created_at"].timestamp(),
+    }
+
+
+def invalidate_lobby(game_id):
+    cache.delete(lobby_cache_key(game_id))
+
+
+def broadcast_lobby(game_id):
+    snapshot = get_lobby_snapshot(game_id)
+    if snapshot is not None:
+        async_to_sync(get_channel_layer().group_send)(
+            f"game_{game_id}", encoded_event("lobby_status", lobby=snapshot)
+        )
+
+
+def refresh_lobby(game_id):
+    # Para usar en on_commit: el snapshot se rearma con los datos confirmados
+    invalidate_lobby(game_id)
+    broadcast_lobby(game_id)
@@ -0,0 +1,107 @@
+import asyncio
+import gc
+import time
+import tracemalloc
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+from games.models import Game, PlayerCard
+from games.routing import websocket_urlpatterns
+from games.views import GameViewSet
+
+
+class Command(BaseCommand):
+    help = "Measure BingoConsumer connect latency under simultaneous connects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument("--timeout", type=float, default=60)
+        parser.add_argument(
+            "--memory",
+            action="store_true",
+            help="Also report traced bytes held per idle connection",
+        )
+
+    def handle(self, *args, **options):
+        count = options["connections"]
+        game, users = self.create_fixtures(count)
+        try:
+            tokens = [str(AccessToken.for_user(user)) for user in users]
+            latencies, failures, per_connection = async_to_sync(self.connect_all)(
+                game.id, tokens, options["timeout"], options["memory"]
+            )
+        finally:
+            game.delete()
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+        latencies.sort()
+        if not latencies:
+            self.stdout.write(f"All {count} connects failed")
+            return
+        self.stdout.write(
+            f"{count} connects, {failures} failed: "
+            f"p50 {self.percentile(latencies, 50):.1f} ms, "
+            f"p95 {self.percentile(latencies, 95):.1f} ms, "
+            f"p99 {self.percentile(latencies, 99):.1f} ms, "
+            f"max {latencies[-1]:.1f} ms"
+        )
+        if per_connection is not None:
+            self.stdout.write(f"{per_connection:.0f} bytes per idle connection")
+
+    def create_fixtures(self, count):
+        game = Game.objects.create()
+        prefix = f"bench_{game.id}_"
+        users = User.objects.bulk_create(
+            [User(username=f"{prefix}{i}") for i in range(count)]
+        )
+        viewset = GameViewSet()
+        PlayerCard.objects.bulk_create(
+            [
+                PlayerCard(
+                    user=user, game=game, card_numbers=viewset.generate_bingo_card()
+                )
+                for user in users
+            ]
+        )
+        return game, users
+
+    async def connect_all(self, game_id, tokens, timeout, memory=False):
+        application = URLRouter(websocket_urlpatterns)
+        communicators = [
+            WebsocketCommunicator(application, f"/ws/game/{game_id}/?token={token}")
+            for token in tokens
+        ]
+
+        async def connect(communicator):
+            start = time.perf_counter()
+            connected, _ = await communicator.connect(timeout=timeout)
+            if connected:
+                # Vaciar el estado inicial para medir el socket ya ocioso
+                await communicator.receive_from(timeout=timeout)
+            return (time.perf_counter() - start) * 1000 if connected else None
+
+        if memory:
+            gc.collect()
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        results = await asyncio.gather(*(connect(c) for c in communicators))
+        latencies = [r for r in results if r is not None]
+
+        per_connection = None
+        if memory:
+            # Esperar a que se envíe el roster_diff y medir en reposo
+            await asyncio.sleep(1)
+            gc.collect()
+            held = tracemalloc.get_traced_memory()[0] - baseline
+            tracemalloc.stop()
+            per_connection = held / max(len(latencies), 1)
+
+        await asyncio.gather(*(c.disconnect() for c in communicators))
+        return latencies, len(results) - len(latencies), per_connection
+
+    def percentile(self, values, pct):
+        return values[min(len(values) - 1, int(len(values) * pct / 100))]
@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Se ejecuta en un proceso nuevo para medir un arranque en frío real
+# En Linux ru_maxrss hereda el pico del proceso padre (manage.py) a través
+# del fork, así que se lee la memoria del propio proceso en /proc
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import settings.asgi
+elapsed = time.perf_counter() - start
+try:
+    with open("/proc/self/status") as status:
+        fields = dict(line.split(":", 1) for line in status)
+    peak = int(fields["VmHWM"].split()[0]) * 1024
+    rss = int(fields["VmRSS"].split()[0]) * 1024
+except OSError:
+    # macOS: sin /proc; ru_maxrss ya viene en bytes y es del proceso nuevo
+    peak = rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(
+    json.dumps(
+        {"seconds": elapsed, "peak": peak, "rss": rss, "modules": len(sys.modules)}
+    )
+)
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start time and RSS of an ASGI worker per settings module"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settings-module",
+            action="append",
+            dest="settings_modules",
+            help="Settings module to measure (repeatable)",
+        )
+        parser.add_argument("--runs", type=int, default=5)
+
+    def handle(self, *args, **options):
+        modules = options["settings_modules"] or [
+            "settings.settings",
+            "settings.production",
+        ]
+        for module in modules:
+            results = [self.probe(module) for _ in range(options["runs"])]
+            seconds = sorted(r["seconds"] for r in results)
+            rss = max(r["rss"] for r in results)
+            peak = max(r["peak"] for r in results)
+            self.stdout.write(
+                f"{module}: median {seconds[len(seconds) // 2] * 1000:.1f} ms, "
+                f"RSS {rss / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB), "
+                f"{results[0]['modules']} modules loaded"
+            )
+
+    def probe(self, module):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": module}
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
@@ -0,0 +1,75 @@
+import time
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from games.models import Tournament, TournamentEntry
+from games.tournaments import (
+    BULK_BATCH_SIZE,
+    TournamentScheduler,
+    get_standings,
+    start_tournament,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark a tournament: room distribution, draw ticks and standings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=50000)
+        parser.add_argument("--room-size", type=int, default=100)
+        parser.add_argument("--ticks", type=int, default=10)
+
+    def handle(self, *args, **options):
+        tournament = Tournament.objects.create(
+            name="bench", room_size=options["room_size"]
+        )
+        prefix = f"bench_t{tournament.id}_"
+        try:
+            started = time.perf_counter()
+            users = User.objects.bulk_create(
+                [User(username=f"{prefix}{i}") for i in range(options["players"])],
+                batch_size=BULK_BATCH_SIZE,
+            )
+            TournamentEntry.objects.bulk_create(
+                [TournamentEntry(tournament=tournament, user=user) for user in users],
+                batch_size=BULK_BATCH_SIZE,
+            )
+            self.report("register", started)
+
+            started = time.perf_counter()
+            tournament = start_tournament(tournament.id)
+            self.report(f"distribute into {tournament.room_count} rooms", started)
+
+            async_to_sync(self.run_ticks)(tournament.id, options["ticks"])
+
+            started = time.perf_counter()
+            get_standings(tournament.id)
+            self.report("standings (top 100)", started)
+        finally:
+            tournament.delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+    async def run_ticks(self, tournament_id, ticks):
+        scheduler = TournamentScheduler(tournament_id, get_channel_layer(), interval=0)
+
+        started = time.perf_counter()
+        available_numbers = sorted(await scheduler.load())
+        self.report("load cards and evaluator", started)
+
+        durations = []
+        for number in available_numbers[:ticks]:
+            started = time.perf_counter()
+            await scheduler.draw(number)
+            durations.append(time.perf_counter() - started)
+
+        if not durations:
+            return
+        durations.sort()
+        self.stdout.write(
+            f"draw tick: median {durations[len(durations) // 2] * 1000:.1f} ms, "
+            f"max {durations[-1] * 1000:.1f} ms over {len(durations)} ticks"
+        )
+
+    def report(self, label, started):
+        self.stdout.write(f"{label}: {(time.perf_counter() - started) * 1000:.1f} ms")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from games.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    export_queryset,
+    iter_export,
+    parse_export_filters,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream games and player cards as NDJSON or CSV with constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--status", help="Only games with this status")
+        parser.add_argument("--since", help="Games created on or after this date")
+        parser.add_argument("--until", help="Games created on or before this date")
+        parser.add_argument("--output", help="File to write to (default: stdout)")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_export_filters(
+                status=options["status"],
+                since=options["since"],
+                until=options["until"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = iter_export(
+            export_queryset(**filters), options["format"], options["chunk_size"]
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(rows)
+        else:
+            for row in rows:
+                self.stdout.write(row, ending="")
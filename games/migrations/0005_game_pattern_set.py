@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0004_alter_game_table_alter_playercard_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='pattern_set',
+            field=models.CharField(choices=[('classic', 'Classic'), ('blackout', 'Blackout'), ('x', 'X'), ('letters', 'Letters')], default='classic', max_length=20),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:40
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('games', '0005_game_pattern_set'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('registering', 'Registering'), ('running', 'Running'), ('finished', 'Finished')], default='registering', max_length=12)),
+                ('room_size', models.PositiveIntegerField(default=50)),
+                ('pattern_set', models.CharField(choices=[('classic', 'Classic'), ('blackout', 'Blackout'), ('x', 'X'), ('letters', 'Letters')], default='classic', max_length=20)),
+                ('drawn_numbers', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, size=None)),
+                ('room_count', models.PositiveIntegerField(default=0)),
+                ('rooms_finished', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'tournaments',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='tournament',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='games.tournament'),
+        ),
+        migrations.CreateModel(
+            name='TournamentEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('draws_to_win', models.PositiveIntegerField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='games.game')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='games.tournament')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'tournament_entries',
+                'indexes': [models.Index(fields=['tournament', '-wins', 'draws_to_win'], name='tournament_standings_idx')],
+                'unique_together': {('tournament', 'user')},
+            },
+        ),
+    ]
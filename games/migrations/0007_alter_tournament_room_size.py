@@ -0,0 +1,19 @@
+# Generated by Django 4.2.16 on 2026-10-19 14:05
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_tournament'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tournament',
+            name='room_size',
+            field=models.PositiveIntegerField(default=50, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -1,6 +1,36 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
+from django.core.validators import MinValueValidator
+from .patterns import DEFAULT_PATTERN_SET, PATTERN_SET_CHOICES
+
+
+class Tournament(models.Model):
+    STATUS_CHOICES = [
+        ("registering", "Registering"),
+        ("running", "Running"),
+        ("finished", "Finished"),
+    ]
+
+    name = models.CharField(max_length=100)
+    status = models.CharField(
+        max_length=12, choices=STATUS_CHOICES, default="registering"
+    )
+    room_size = models.PositiveIntegerField(
+        default=50, validators=[MinValueValidator(1)]
+    )
+    pattern_set = models.CharField(
+        max_length=20, choices=PATTERN_SET_CHOICES, default=DEFAULT_PATTERN_SET
+    )
+    drawn_numbers = ArrayField(models.IntegerField(), default=list)
+    room_count = models.PositiveIntegerField(default=0)
+    rooms_finished = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        db_table = "tournaments"
 
 
 class Game(models.Model):
@@ -18,6 +48,16 @@ class Game(models.Model):
     )
     drawn_numbers = ArrayField(models.IntegerField(), default=list)
     current_number = models.IntegerField(null=True, blank=True)
+    pattern_set = models.CharField(
+        max_length=20, choices=PATTERN_SET_CHOICES, default=DEFAULT_PATTERN_SET
+    )
+    tournament = models.ForeignKey(
+        Tournament,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="rooms",
+    )
 
     class Meta:
         ordering = ["-created_at"]
@@ -37,3 +77,25 @@ class PlayerCard(models.Model):
     class Meta:
         unique_together = ["user", "game"]
         db_table = "player_cards"
+
+
+class TournamentEntry(models.Model):
+    tournament = models.ForeignKey(
+        Tournament, on_delete=models.CASCADE, related_name="entries"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, null=True, blank=True)
+    wins = models.PositiveIntegerField(default=0)
+    draws_to_win = models.PositiveIntegerField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ["tournament", "user"]
+        db_table = "tournament_entries"
+        indexes = [
+            models.Index(
+                fields=["tournament", "-wins", "draws_to_win"],
+                name="tournament_standings_idx",
+            )
+        ]
@@ -0,0 +1,106 @@
+"""
+Win patterns compiled to 25-bit masks, one bit per cell (row * 5 + col).
+
+A card's marked cells are kept as a mask too, so checking a pattern is a
+single AND and "how many cells are missing" is a popcount.
+"""
+
+from collections import defaultdict
+
+FREE_SPACE = 0
+CARD_SIZE = 5
+
+
+def cell_bit(row, col):
+    return 1 << (row * CARD_SIZE + col)
+
+
+def compile_pattern(cells):
+    mask = 0
+    for row, col in cells:
+        mask |= cell_bit(row, col)
+    return mask
+
+
+ROWS = [compile_pattern((r, c) for c in range(5)) for r in range(5)]
+COLUMNS = [compile_pattern((r, c) for r in range(5)) for c in range(5)]
+DIAGONAL = compile_pattern((i, i) for i in range(5))
+ANTI_DIAGONAL = compile_pattern((i, 4 - i) for i in range(5))
+FOUR_CORNERS = compile_pattern([(0, 0), (0, 4), (4, 0), (4, 4)])
+BLACKOUT = (1 << CARD_SIZE * CARD_SIZE) - 1
+
+LETTER_T = ROWS[0] | COLUMNS[2]
+LETTER_L = COLUMNS[0] | ROWS[4]
+LETTER_U = COLUMNS[0] | COLUMNS[4] | ROWS[4]
+LETTER_H = COLUMNS[0] | COLUMNS[4] | ROWS[2]
+
+PATTERN_SETS = {
+    "classic": ROWS + COLUMNS + [DIAGONAL, ANTI_DIAGONAL, FOUR_CORNERS],
+    "blackout": [BLACKOUT],
+    "x": [DIAGONAL | ANTI_DIAGONAL],
+    "letters": [LETTER_T, LETTER_L, LETTER_U, LETTER_H],
+}
+PATTERN_SET_CHOICES = [(name, name.capitalize()) for name in PATTERN_SETS]
+DEFAULT_PATTERN_SET = "classic"
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def cell_bits(card_numbers):
+    return {
+        number: cell_bit(row, col)
+        for row, numbers in enumerate(card_numbers)
+        for col, number in enumerate(numbers)
+    }
+
+
+def marked_mask(card_numbers, numbers):
+    bits = cell_bits(card_numbers)
+    mask = bits.get(FREE_SPACE, 0)
+    for number in numbers:
+        mask |= bits.get(number, 0)
+    return mask
+
+
+def is_win(mask, pattern_set=DEFAULT_PATTERN_SET):
+    return any(mask & pattern == pattern for pattern in PATTERN_SETS[pattern_set])
+
+
+def cells_to_win(mask, pattern_set=DEFAULT_PATTERN_SET):
+    return min(popcount(pattern & ~mask) for pattern in PATTERN_SETS[pattern_set])
+
+
+class DrawEvaluator:
+    """
+    Tracks every card of a game against the drawn numbers. Each draw only
+    touches the cards that contain the number, and returns their updated
+    "cells to win" counts.
+    """
+
+    def __init__(self, cards, pattern_set=DEFAULT_PATTERN_SET):
+        self.pattern_set = pattern_set
+        self.masks = {}
+        self.remaining = {}
+        self.cells = defaultdict(list)
+
+        for card_id, card_numbers in cards.items():
+            mask = 0
+            for number, bit in cell_bits(card_numbers).items():
+                if number == FREE_SPACE:
+                    mask |= bit
+                else:
+                    self.cells[number].append((card_id, bit))
+            self.masks[card_id] = mask
+            self.remaining[card_id] = cells_to_win(mask, pattern_set)
+
+    def draw(self, number):
+        changed = {}
+        for card_id, bit in self.cells.pop(number, ()):
+            self.masks[card_id] |= bit
+            remaining = cells_to_win(self.masks[card_id], self.pattern_set)
+            if remaining != self.remaining[card_id]:
+                self.remaining[card_id] = remaining
+                changed[card_id] = remaining
+        return changed
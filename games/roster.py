@@ -0,0 +1,167 @@
+"""
+In-memory roster per game.
+
+Joins, leaves and disqualifications are collected for ROSTER_DEBOUNCE
+seconds and sent as a single roster_diff to the game group, so N players
+joining produce O(N) messages instead of one broadcast per socket.
+"""
+
+import asyncio
+import itertools
+import json
+import uuid
+from channels.db import database_sync_to_async
+from .events import encoded_event
+from .models import PlayerCard
+
+ROSTER_DEBOUNCE = 0.25
+
+
+def load_players(game_id):
+    return list(
+        PlayerCard.objects.filter(game_id=game_id).values(
+            "user__username", "is_disqualified"
+        )
+    )
+
+
+class Roster:
+    def __init__(self, players):
+        # username -> [is_disqualified, sockets abiertos]
+        self.players = {
+            player["user__username"]: [player["is_disqualified"], 0]
+            for player in players
+        }
+        self.broadcasted = {
+            username: self.state(username) for username in self.players
+        }
+        # Jugadores conectados a otros workers
+        self.remote_online = set()
+        self.dirty = set()
+        self.flush_task = None
+        # Último diff remoto aplicado: cada consumer del worker lo recibe
+        self.last_remote = None
+
+    def state(self, username):
+        is_disqualified, sockets = self.players[username]
+        return is_disqualified, sockets > 0
+
+    def as_list(self):
+        return [
+            {
+                "username": username,
+                "is_disqualified": is_disqualified,
+                "online": sockets > 0 or username in self.remote_online,
+            }
+            for username, (is_disqualified, sockets) in self.players.items()
+        ]
+
+    def online_count(self):
+        return sum(1 for _, sockets in self.players.values() if sockets > 0)
+
+    def diff(self):
+        joined, left, disqualified = [], [], []
+        for username in self.dirty:
+            before = self.broadcasted.get(username, (False, False))
+            after = self.state(username)
+            if after[0] and not before[0]:
+                disqualified.append(username)
+            if after[1] and not before[1]:
+                joined.append(username)
+            elif before[1] and not after[1]:
+                left.append(username)
+            self.broadcasted[username] = after
+        self.dirty.clear()
+        return {"joined": joined, "left": left, "disqualified": disqualified}
+
+
+class RosterRegistry:
+    def __init__(self, debounce=ROSTER_DEBOUNCE):
+        self.debounce = debounce
+        self.rosters = {}
+        self.origin = uuid.uuid4().hex
+        self.sequence = itertools.count()
+
+    def is_loaded(self, game_id):
+        return int(game_id) in self.rosters
+
+    async def get(self, game_id, players=None):
+        """Return the game's roster, loading it from ``players`` or the database."""
+        game_id = int(game_id)
+        roster = self.rosters.get(game_id)
+        if roster is None:
+            if players is None:
+                players = await database_sync_to_async(load_players)(game_id)
+            # Otra corrutina pudo cargarlo mientras se esperaba la consulta
+            roster = self.rosters.setdefault(game_id, Roster(players))
+        return roster
+
+    async def join(self, game_id, username, channel_layer):
+        game_id = int(game_id)
+        roster = await self.get(game_id)
+        roster.players.setdefault(username, [False, 0])[1] += 1
+        self._touch(game_id, roster, username, channel_layer)
+
+    async def leave(self, game_id, username, channel_layer):
+        game_id = int(game_id)
+        roster = self.rosters.get(game_id)
+        if roster is None or username not in roster.players:
+            return
+        entry = roster.players[username]
+        entry[1] = max(0, entry[1] - 1)
+        self._touch(game_id, roster, username, channel_layer)
+
+    async def disqualify(self, game_id, username, channel_layer):
+        game_id = int(game_id)
+        roster = await self.get(game_id)
+        roster.players.setdefault(username, [False, 0])[0] = True
+        self._touch(game_id, roster, username, channel_layer)
+
+    def apply(self, game_id, event):
+        """Apply a roster_diff broadcast by another worker to the local roster."""
+        roster = self.rosters.get(int(game_id))
+        if roster is None or event["origin"] == self.origin:
+            return
+        # Se aplica una vez por worker aunque llegue a cada uno de sus sockets
+        diff_id = (event["origin"], event["seq"])
+        if roster.last_remote == diff_id:
+            return
+        roster.last_remote = diff_id
+        diff = json.loads(event["text"])
+        for username in diff["joined"]:
+            roster.players.setdefault(username, [False, 0])
+            roster.remote_online.add(username)
+        for username in diff["left"]:
+            roster.remote_online.discard(username)
+        for username in diff["disqualified"]:
+            roster.players.setdefault(username, [False, 0])[0] = True
+            online = roster.broadcasted.get(username, (False, False))[1]
+            roster.broadcasted[username] = (True, online)
+
+    def discard(self, game_id):
+        roster = self.rosters.pop(int(game_id), None)
+        if roster and roster.flush_task:
+            roster.flush_task.cancel()
+
+    def _touch(self, game_id, roster, username, channel_layer):
+        roster.dirty.add(username)
+        if roster.flush_task is None:
+            roster.flush_task = asyncio.create_task(
+                self._flush(game_id, roster, channel_layer)
+            )
+
+    async def _flush(self, game_id, roster, channel_layer):
+        await asyncio.sleep(self.debounce)
+        roster.flush_task = None
+        diff = roster.diff()
+        if any(diff.values()):
+            message = encoded_event("roster_diff", **diff)
+            message["origin"] = self.origin
+            message["seq"] = next(self.sequence)
+            await channel_layer.group_send(f"game_{game_id}", message)
+        if roster.online_count() == 0 and self.rosters.get(game_id) is roster:
+            # Nadie conectado en este worker: liberar la memoria
+            del self.rosters[game_id]
+
+
+roster_registry = RosterRegistry()
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Game, PlayerCard
+from .models import Game, PlayerCard, Tournament, TournamentEntry
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -32,5 +32,35 @@ class GameSerializer(serializers.ModelSerializer):
             "winner",
             "drawn_numbers",
             "current_number",
+            "pattern_set",
             "player_cards",
         )
+
+
+class TournamentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tournament
+        fields = (
+            "id",
+            "name",
+            "status",
+            "room_size",
+            "pattern_set",
+            "room_count",
+            "rooms_finished",
+            "created_at",
+            "starts_at",
+        )
+        read_only_fields = (
+            "status",
+            "room_count",
+            "rooms_finished",
+            "created_at",
+            "starts_at",
+        )
+
+
+class TournamentEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TournamentEntry
+        fields = ("id", "tournament", "game", "wins", "draws_to_win", "finished_at")
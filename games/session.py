@@ -0,0 +1,43 @@
+from .patterns import marked_mask
+
+
+def card_group_name(card_id):
+    # Grupo de un solo cartón: los mensajes propios del jugador no pasan por
+    # el grupo del juego
+    return f"card_{card_id}"
+
+
+class ConnectionSession:
+    """
+    Per-socket state kept by BingoConsumer. Only ids and the card are held
+    here; game metadata and the roster are shared per game and looked up
+    when needed.
+    """
+
+    __slots__ = ("user_id", "username", "game_id", "card_id", "card", "mask")
+
+    def __init__(self, user_id, username, game_id, card_id, card_numbers, selected):
+        self.user_id = user_id
+        self.username = username
+        self.game_id = int(game_id)
+        self.card_id = card_id
+        # Los números van de 0 a 75: el cartón cabe en 25 bytes, fila por fila
+        self.card = bytes(number for row in card_numbers for number in row)
+        self.mask = marked_mask(card_numbers, selected)
+
+    @property
+    def group_name(self):
+        return f"game_{self.game_id}"
+
+    @property
+    def card_group_name(self):
+        return card_group_name(self.card_id)
+
+    @property
+    def card_numbers(self):
+        return [list(self.card[row * 5 : row * 5 + 5]) for row in range(5)]
+
+    def mark(self, number):
+        index = self.card.find(number)
+        if index >= 0:
+            self.mask |= 1 << index
@@ -0,0 +1,509 @@
+"""
+Game ownership across worker processes.
+
+Each game ID is assigned to exactly one worker with a consistent hash ring
+built from the live workers. The owner holds a lease on the game while its
+draw loop runs, so two workers can never draw numbers for the same game.
+Workers that are not the owner route authoritative actions (starting and
+ending a game) to the owner through the channel layer. Tournaments are
+owned the same way, keyed as "tournament:<id>", and their single scheduler
+draws for every room.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import re
+import socket
+import time
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .caching import CACHE_STATS_INTERVAL, log_cache_stats
+from .draws import mark_game_playing, run_draw_loop
+from .events import encoded_event
+from .lobby import invalidate_lobby
+from .models import Game, Tournament
+from .roster import roster_registry
+from .teardown import (
+    FOOTPRINT_DELAY,
+    build_game_summary,
+    game_footprint,
+    load_card_ids,
+)
+from .tournaments import TournamentScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDING = {
+    "BACKEND": "games.sharding.LocalLeaseBackend",
+    "WORKER_ID": None,
+    "VIRTUAL_NODES": 64,
+    "HEARTBEAT_INTERVAL": 5,
+    "LEASE_TTL": 15,
+}
+
+TOURNAMENT_PREFIX = "tournament:"
+
+
+def get_sharding_setting(name):
+    return getattr(settings, "BINGO_SHARDING", {}).get(name, DEFAULT_SHARDING[name])
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes=(), virtual_nodes=64):
+        self.virtual_nodes = virtual_nodes
+        self._keys = []
+        self._owners = {}
+        self.nodes = set()
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.virtual_nodes):
+            key = _hash(f"{node}#{i}")
+            self._owners[key] = node
+            bisect.insort(self._keys, key)
+
+    def remove_node(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.virtual_nodes):
+            key = _hash(f"{node}#{i}")
+            del self._owners[key]
+            self._keys.remove(key)
+
+    def get_node(self, key):
+        if not self._keys:
+            return None
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[self._keys[idx]]
+
+
+class LocalLeaseBackend:
+    """
+    In-process stand-in for the Postgres backend. Members and game leases
+    expire after LEASE_TTL seconds unless renewed by the heartbeat.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or get_sharding_setting("LEASE_TTL")
+        self._members = {}
+        self._leases = {}
+
+    def _expired(self, expires_at):
+        return expires_at < time.monotonic()
+
+    async def join(self, worker_id):
+        self._members[worker_id] = time.monotonic() + self.ttl
+
+    async def leave(self, worker_id):
+        self._members.pop(worker_id, None)
+        for game_id, (owner, _) in list(self._leases.items()):
+            if owner == worker_id:
+                del self._leases[game_id]
+
+    async def heartbeat(self, worker_id):
+        expires_at = time.monotonic() + self.ttl
+        self._members[worker_id] = expires_at
+        for game_id, (owner, _) in self._leases.items():
+            if owner == worker_id:
+                self._leases[game_id] = (owner, expires_at)
+
+    async def members(self):
+        for worker_id, expires_at in list(self._members.items()):
+            if self._expired(expires_at):
+                del self._members[worker_id]
+        return set(self._members)
+
+    async def acquire(self, game_id, worker_id):
+        lease = self._leases.get(game_id)
+        if lease and lease[0] != worker_id and not self._expired(lease[1]):
+            return False
+        self._leases[game_id] = (worker_id, time.monotonic() + self.ttl)
+        return True
+
+    async def release(self, game_id, worker_id):
+        lease = self._leases.get(game_id)
+        if lease and lease[0] == worker_id:
+            del self._leases[game_id]
+
+    async def reset(self):
+        pass
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class AdvisoryLockLeaseBackend:
+    """
+    Leases stored as Postgres session-level advisory locks on a dedicated
+    connection. If the worker dies its session ends and Postgres releases
+    every lock it held, which is what makes failover work.
+    """
+
+    MEMBER_NAMESPACE = 7301
+    GAME_NAMESPACE = 7302
+    TOURNAMENT_NAMESPACE = 7303
+
+    def __init__(self, ttl=None):
+        self._connection = None
+        self._pid = None
+        self._lock = asyncio.Lock()
+
+    def _cursor(self):
+        if self._connection is None:
+            from django.db import connections
+
+            self._connection = connections.create_connection("default")
+            self._connection.inc_thread_sharing()
+        return self._connection.cursor()
+
+    def _lock_args(self, key):
+        # Los torneos usan claves "tournament:<id>" y su propio namespace
+        if isinstance(key, str) and key.startswith(TOURNAMENT_PREFIX):
+            tournament_id = int(key[len(TOURNAMENT_PREFIX) :])
+            return [self.TOURNAMENT_NAMESPACE, tournament_id % 2**31]
+        return [self.GAME_NAMESPACE, int(key) % 2**31]
+
+    async def _fetch(self, sql, params=()):
+        @database_sync_to_async
+        def run():
+            with self._cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+
+        async with self._lock:
+            return await run()
+
+    async def join(self, worker_id):
+        await self._fetch("SELECT set_config('application_name', %s, false)", [worker_id])
+        await self._fetch(
+            "SELECT pg_try_advisory_lock(%s, pg_backend_pid())",
+            [self.MEMBER_NAMESPACE],
+        )
+        rows = await self._fetch("SELECT pg_backend_pid()")
+        self._pid = rows[0][0]
+
+    async def leave(self, worker_id):
+        await self._fetch("SELECT pg_advisory_unlock_all()")
+
+    async def heartbeat(self, worker_id):
+        # Los locks viven mientras viva la sesión: otra sesión (p. ej. tras
+        # una reconexión) ya no tiene ninguno
+        rows = await self._fetch("SELECT pg_backend_pid()")
+        if self._pid is None or rows[0][0] != self._pid:
+            raise LeaseLost(f"Advisory lock session lost for {worker_id}")
+
+    async def members(self):
+        rows = await self._fetch(
+            "SELECT DISTINCT a.application_name FROM pg_locks l "
+            "JOIN pg_stat_activity a ON a.pid = l.pid "
+            "WHERE l.locktype = 'advisory' AND l.classid = %s AND l.granted",
+            [self.MEMBER_NAMESPACE],
+        )
+        return {row[0] for row in rows}
+
+    async def acquire(self, game_id, worker_id):
+        # pg_try_advisory_lock es reentrante dentro de la misma sesión,
+        # así que solo se pide una vez por juego
+        rows = await self._fetch(
+            "SELECT pg_try_advisory_lock(%s, %s)", self._lock_args(game_id)
+        )
+        return rows[0][0]
+
+    async def release(self, game_id, worker_id):
+        await self._fetch(
+            "SELECT pg_advisory_unlock(%s, %s)", self._lock_args(game_id)
+        )
+
+    async def reset(self):
+        # Descartar la sesión: la próxima operación abre una conexión nueva
+        async with self._lock:
+            connection, self._connection = self._connection, None
+            self._pid = None
+        if connection is not None:
+            try:
+                await database_sync_to_async(connection.close)()
+            except Exception as e:
+                logger.warning(f"Error closing lease connection: {str(e)}")
+
+
+class ShardCoordinator:
+    def __init__(self, worker_id=None, backend=None):
+        self.worker_id = (
+            worker_id or get_sharding_setting("WORKER_ID") or default_worker_id()
+        )
+        self.backend = backend or import_string(get_sharding_setting("BACKEND"))()
+        self.ring = HashRing(virtual_nodes=get_sharding_setting("VIRTUAL_NODES"))
+        self.channel_layer = None
+        self.draw_tasks = {}
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._tasks = []
+        self._footprint_tasks = set()
+
+    @staticmethod
+    def group_name(worker_id):
+        return "shard_" + re.sub(r"[^a-zA-Z0-9_.-]", "-", worker_id)[:90]
+
+    async def ensure_started(self, channel_layer):
+        if self._started:
+            return
+        async with self._start_lock:
+            if self._started:
+                return
+            self.channel_layer = channel_layer
+            await self.backend.join(self.worker_id)
+            await self.refresh_members()
+            self.channel_name = await channel_layer.new_channel()
+            await channel_layer.group_add(
+                self.group_name(self.worker_id), self.channel_name
+            )
+            self._tasks = [
+                asyncio.create_task(self._listen()),
+                asyncio.create_task(self._heartbeat()),
+            ]
+            # Solo al final: si algo falla, la próxima conexión lo reintenta
+            self._started = True
+        logger.info(f"Shard worker {self.worker_id} joined")
+
+    async def stop(self):
+        for task in self._tasks + list(self.draw_tasks.values()):
+            task.cancel()
+        self.draw_tasks.clear()
+        await self.backend.leave(self.worker_id)
+        if self.channel_layer:
+            await self.channel_layer.group_discard(
+                self.group_name(self.worker_id), self.channel_name
+            )
+        self._started = False
+
+    def owner_for(self, game_id):
+        return self.ring.get_node(game_id)
+
+    def is_owner(self, game_id):
+        return self.owner_for(game_id) == self.worker_id
+
+    async def route_start_game(self, game_id):
+        game_id = int(game_id)
+        owner = self.owner_for(game_id)
+        if owner is None or owner == self.worker_id:
+            await self.start_game(game_id)
+        else:
+            await self.channel_layer.group_send(
+                self.group_name(owner), {"type": "shard.start_game", "game_id": game_id}
+            )
+
+    async def route_end_game(self, game_id):
+        game_id = int(game_id)
+        owner = self.owner_for(game_id)
+        if owner is None or owner == self.worker_id:
+            await self.end_game(game_id)
+        else:
+            await self.channel_layer.group_send(
+                self.group_name(owner), {"type": "shard.end_game", "game_id": game_id}
+            )
+
+    async def route_start_tournament(self, tournament_id):
+        tournament_id = int(tournament_id)
+        owner = self.owner_for(f"{TOURNAMENT_PREFIX}{tournament_id}")
+        if owner is None or owner == self.worker_id:
+            await self.start_tournament(tournament_id)
+        else:
+            await self.channel_layer.group_send(
+                self.group_name(owner),
+                {"type": "shard.start_tournament", "tournament_id": tournament_id},
+            )
+
+    async def start_game(self, game_id):
+        if game_id in self.draw_tasks:
+            return
+        if not await self.backend.acquire(game_id, self.worker_id):
+            return
+
+        if await mark_game_playing(game_id):
+            await self.channel_layer.group_send(
+                f"game_{game_id}",
+                encoded_event("game_starting", message="El juego está comenzando"),
+            )
+
+        self._track(game_id, self._run_game(game_id))
+
+    async def _run_game(self, game_id):
+        if await run_draw_loop(game_id, self.channel_layer):
+            await self.end_game(game_id)
+
+    async def start_tournament(self, tournament_id):
+        key = f"{TOURNAMENT_PREFIX}{tournament_id}"
+        if key in self.draw_tasks:
+            return
+        if not await self.backend.acquire(key, self.worker_id):
+            return
+        scheduler = TournamentScheduler(
+            tournament_id, self.channel_layer, end_room=self.route_end_game
+        )
+        self._track(key, scheduler.run())
+
+    def _track(self, key, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.draw_tasks[key] = task
+        task.add_done_callback(
+            lambda t: asyncio.ensure_future(self._draw_finished(key, t))
+        )
+
+    async def _draw_finished(self, key, task):
+        if self.draw_tasks.get(key) is task:
+            del self.draw_tasks[key]
+            await self.backend.release(key, self.worker_id)
+
+    async def end_game(self, game_id):
+        task = self.draw_tasks.get(game_id)
+        # end_game también se llama desde la propia tarea del sorteo
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        invalidate_lobby(game_id)
+        roster_registry.discard(game_id)
+
+        summary = await build_game_summary(game_id)
+        if summary:
+            # Cada consumer envía el resumen y cierra su socket
+            await self.channel_layer.group_send(
+                f"game_{game_id}", encoded_event("game_over", summary=summary)
+            )
+        # Se guarda la referencia para que la tarea no se recolecte a medias
+        task = asyncio.create_task(self._report_footprint(game_id))
+        self._footprint_tasks.add(task)
+        task.add_done_callback(self._footprint_tasks.discard)
+
+    async def _report_footprint(self, game_id):
+        await asyncio.sleep(FOOTPRINT_DELAY)
+        card_ids = await load_card_ids(game_id)
+        footprint = game_footprint(
+            game_id, self.channel_layer, self.draw_tasks, card_ids
+        )
+        if any(footprint.values()):
+            logger.warning(f"Game {game_id} still holds state after teardown: {footprint}")
+        else:
+            logger.info(f"Game {game_id} torn down")
+
+    async def refresh_members(self):
+        members = await self.backend.members()
+        members.add(self.worker_id)
+        if members == self.ring.nodes:
+            return False
+
+        for node in self.ring.nodes - members:
+            self.ring.remove_node(node)
+        for node in members - self.ring.nodes:
+            self.ring.add_node(node)
+        logger.info(f"Shard ring rebalanced: {sorted(members)}")
+
+        # Soltar los juegos que ahora pertenecen a otro worker
+        for key, task in list(self.draw_tasks.items()):
+            if not self.is_owner(key):
+                task.cancel()
+        return True
+
+    @database_sync_to_async
+    def get_playing_game_ids(self):
+        # Las salas de torneo las sortea el scheduler del torneo
+        return list(
+            Game.objects.filter(status="playing", tournament__isnull=True).values_list(
+                "id", flat=True
+            )
+        )
+
+    @database_sync_to_async
+    def get_running_tournament_ids(self):
+        return list(
+            Tournament.objects.filter(status="running").values_list("id", flat=True)
+        )
+
+    async def adopt_orphans(self):
+        for game_id in await self.get_playing_game_ids():
+            if game_id not in self.draw_tasks and self.is_owner(game_id):
+                await self.start_game(game_id)
+        for tournament_id in await self.get_running_tournament_ids():
+            key = f"{TOURNAMENT_PREFIX}{tournament_id}"
+            if key not in self.draw_tasks and self.is_owner(key):
+                await self.start_tournament(tournament_id)
+
+    async def _fence(self):
+        """Stop every draw after losing the leases: another worker may hold them."""
+        tasks = list(self.draw_tasks.values())
+        # Se vacía antes de cancelar para que _draw_finished no libere nada
+        self.draw_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await self.backend.reset()
+        logger.warning(f"Shard worker {self.worker_id} fenced {len(tasks)} draws")
+
+    async def _heartbeat(self):
+        interval = get_sharding_setting("HEARTBEAT_INTERVAL")
+        stats_logged_at = time.monotonic()
+        rejoin = False
+        while True:
+            try:
+                if rejoin:
+                    # Volver a unirse antes de adoptar cualquier juego
+                    await self.backend.join(self.worker_id)
+                    rejoin = False
+                    logger.info(f"Shard worker {self.worker_id} rejoined")
+                await self.backend.heartbeat(self.worker_id)
+                await self.channel_layer.group_add(
+                    self.group_name(self.worker_id), self.channel_name
+                )
+                await self.refresh_members()
+                await self.adopt_orphans()
+                if time.monotonic() - stats_logged_at >= CACHE_STATS_INTERVAL:
+                    stats_logged_at = time.monotonic()
+                    log_cache_stats()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Sin confirmar los leases no se puede seguir sorteando
+                logger.error(f"Shard heartbeat error: {str(e)}")
+                await self._fence()
+                rejoin = True
+            await asyncio.sleep(interval)
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self.channel_layer.receive(self.channel_name)
+                if message.get("type") == "shard.start_game":
+                    await self.start_game(int(message["game_id"]))
+                elif message.get("type") == "shard.end_game":
+                    await self.end_game(int(message["game_id"]))
+                elif message.get("type") == "shard.start_tournament":
+                    await self.start_tournament(int(message["tournament_id"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Shard listener error: {str(e)}")
+
+
+coordinator = None
+
+
+def get_coordinator():
+    global coordinator
+    if coordinator is None:
+        coordinator = ShardCoordinator()
+    return coordinator
@@ -0,0 +1,56 @@
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.db.models import Count
+from .lobby import lobby_cache_key
+from .models import Game, PlayerCard
+from .roster import roster_registry
+from .session import card_group_name
+
+GAME_OVER_CLOSE_CODE = 1000
+ENDED_STATUSES = ("finished", "cancelled")
+FOOTPRINT_DELAY = 2
+
+
+@database_sync_to_async
+def build_game_summary(game_id):
+    game = (
+        Game.objects.select_related("winner")
+        .annotate(player_count=Count("playercard__user", distinct=True))
+        .filter(id=game_id)
+        .first()
+    )
+    if not game:
+        return None
+    return {
+        "game_id": game.id,
+        "status": game.status,
+        "winner": game.winner.username if game.winner else None,
+        "drawn_numbers": game.drawn_numbers,
+        "total_drawn": len(game.drawn_numbers),
+        "player_count": game.player_count,
+    }
+
+
+@database_sync_to_async
+def load_card_ids(game_id):
+    return list(PlayerCard.objects.filter(game_id=game_id).values_list("id", flat=True))
+
+
+def game_footprint(game_id, channel_layer, draw_tasks, card_ids=()):
+    """
+    In-memory state still held for a game. Every value should be zero once
+    the game has been torn down and its sockets closed.
+    """
+    groups = getattr(channel_layer, "groups", {})
+    group = groups.get(f"game_{game_id}", {})
+    cached = cache.get(lobby_cache_key(game_id))
+    roster = roster_registry.rosters.get(int(game_id))
+    return {
+        "group_channels": len(group),
+        "card_group_channels": sum(
+            len(groups.get(card_group_name(card_id), {})) for card_id in card_ids
+        ),
+        "draw_tasks": 1 if game_id in draw_tasks else 0,
+        "lobby_cached": 1 if cached is not None else 0,
+        "roster_players": len(roster.players) if roster else 0,
+    }
@@ -1,3 +1,268 @@
-from django.test import TestCase
+import csv
+import json
+import random
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from games import caching
+from games.export import EXPORT_COLUMNS, export_queryset, iter_export
+from games.models import Game, PlayerCard, Tournament, TournamentEntry
+from games.patterns import (
+    PATTERN_SETS,
+    DrawEvaluator,
+    cells_to_win,
+    is_win,
+    marked_mask,
+)
+from games.view_utils import generate_bingo_card
+from users.authentication import CachedJWTAuthentication
 
-# Create your tests here.
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="exporter")
+        self.game = Game.objects.create(status="finished", drawn_numbers=[5, 17])
+        self.card = PlayerCard.objects.create(
+            user=self.user,
+            game=self.game,
+            card_numbers=generate_bingo_card(),
+            selected_numbers=[5],
+        )
+
+    def test_queryset_rows_have_export_columns(self):
+        rows = list(export_queryset(status="finished"))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(set(rows[0]), set(EXPORT_COLUMNS))
+        self.assertEqual(rows[0]["card_id"], self.card.id)
+        self.assertEqual(rows[0]["game_status"], "finished")
+        self.assertEqual(rows[0]["username"], "exporter")
+
+    def test_csv_export(self):
+        lines = list(iter_export(export_queryset(), "csv"))
+        rows = list(csv.reader("".join(lines).splitlines()))
+        self.assertEqual(rows[0], list(EXPORT_COLUMNS))
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row["card_id"], str(self.card.id))
+        self.assertEqual(json.loads(row["selected_numbers"]), [5])
+
+    def test_ndjson_export(self):
+        lines = list(iter_export(export_queryset(), "ndjson"))
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(list(row), list(EXPORT_COLUMNS))
+        self.assertEqual(row["game_id"], self.game.id)
+        self.assertEqual(row["drawn_numbers"], [5, 17])
+
+    def test_export_command_writes_to_command_stdout(self):
+        out = StringIO()
+        call_command("export_games", "--format", "ndjson", stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["card_id"] for row in rows], [self.card.id])
+
+
+CARD = [
+    [1, 16, 31, 46, 61],
+    [2, 17, 32, 47, 62],
+    [3, 18, 0, 48, 63],
+    [4, 19, 34, 49, 64],
+    [5, 20, 35, 50, 65],
+]
+
+
+def column(card, col):
+    return [row[col] for row in card]
+
+
+def legacy_check_win_condition(card_numbers, selected_numbers):
+    # Versión anterior a las máscaras, para comparar "classic"
+    selected_set = set(selected_numbers)
+    selected_set.add(0)
+    for row in card_numbers:
+        if all(num in selected_set for num in row):
+            return True
+    for col in range(5):
+        if all(card_numbers[row][col] in selected_set for row in range(5)):
+            return True
+    if all(card_numbers[i][i] in selected_set for i in range(5)):
+        return True
+    if all(card_numbers[i][4 - i] in selected_set for i in range(5)):
+        return True
+    corners = [
+        card_numbers[0][0],
+        card_numbers[0][4],
+        card_numbers[4][0],
+        card_numbers[4][4],
+    ]
+    return all(corner in selected_set for corner in corners)
+
+
+class PatternTests(SimpleTestCase):
+    def wins(self, numbers, pattern_set):
+        return is_win(marked_mask(CARD, numbers), pattern_set)
+
+    def test_marked_mask_includes_free_space_and_ignores_other_numbers(self):
+        self.assertEqual(marked_mask(CARD, []), 1 << 12)
+        self.assertEqual(marked_mask(CARD, [75, 60]), 1 << 12)
+        self.assertEqual(marked_mask(CARD, [1, 65]), 1 | 1 << 12 | 1 << 24)
+
+    def test_classic(self):
+        self.assertTrue(self.wins(CARD[0], "classic"))
+        self.assertTrue(self.wins(column(CARD, 4), "classic"))
+        # La diagonal y la fila/columna del centro usan el comodín
+        self.assertTrue(self.wins([1, 17, 49, 65], "classic"))
+        self.assertTrue(self.wins([5, 19, 47, 61], "classic"))
+        self.assertTrue(self.wins([3, 18, 48, 63], "classic"))
+        self.assertTrue(self.wins([1, 61, 5, 65], "classic"))
+        self.assertFalse(self.wins(CARD[0][:4], "classic"))
+        self.assertFalse(self.wins([1, 61, 5], "classic"))
+
+    def test_blackout(self):
+        every_number = [number for row in CARD for number in row if number]
+        self.assertTrue(self.wins(every_number, "blackout"))
+        self.assertFalse(self.wins(every_number[1:], "blackout"))
+        self.assertFalse(self.wins(CARD[0], "blackout"))
+
+    def test_x(self):
+        diagonal = [1, 17, 49, 65]
+        anti_diagonal = [5, 19, 47, 61]
+        self.assertTrue(self.wins(diagonal + anti_diagonal, "x"))
+        self.assertFalse(self.wins(diagonal, "x"))
+        self.assertFalse(self.wins(CARD[0], "x"))
+
+    def test_letters(self):
+        letter_t = CARD[0] + column(CARD, 2)
+        letter_l = column(CARD, 0) + CARD[4]
+        letter_u = column(CARD, 0) + column(CARD, 4) + CARD[4]
+        letter_h = column(CARD, 0) + column(CARD, 4) + CARD[2]
+        for numbers in (letter_t, letter_l, letter_u, letter_h):
+            self.assertTrue(self.wins(numbers, "letters"))
+        self.assertFalse(self.wins(CARD[0], "letters"))
+        self.assertFalse(self.wins(column(CARD, 0) + column(CARD, 4), "letters"))
+
+    def test_classic_matches_legacy_check(self):
+        rng = random.Random(75)
+        state = random.getstate()
+        random.seed(75)
+        try:
+            for _ in range(2000):
+                card = generate_bingo_card()
+                selected = rng.sample(range(1, 76), rng.randint(0, 40))
+                self.assertEqual(
+                    is_win(marked_mask(card, selected), "classic"),
+                    legacy_check_win_condition(card, selected),
+                    (card, selected),
+                )
+        finally:
+            random.setstate(state)
+
+
+class DrawEvaluatorTests(SimpleTestCase):
+    def test_initial_remaining_counts(self):
+        for pattern_set, expected in (
+            ("classic", 4),
+            ("blackout", 24),
+            ("x", 8),
+            # La T pasa por el comodín: 9 celdas, 8 por marcar
+            ("letters", 8),
+        ):
+            evaluator = DrawEvaluator({7: CARD}, pattern_set)
+            self.assertEqual(evaluator.remaining[7], expected, pattern_set)
+
+    def test_draw_returns_only_changed_cards(self):
+        other = [[n + 5 if n else 0 for n in row] for row in CARD]
+        evaluator = DrawEvaluator({1: CARD, 2: other}, "classic")
+
+        self.assertEqual(evaluator.draw(1), {1: 3})
+        self.assertEqual(evaluator.draw(75), {})
+        # El 6 está en ambos cartones pero solo cambia la cuenta del segundo
+        self.assertEqual(evaluator.draw(6), {2: 3})
+        self.assertEqual(evaluator.draw(17), {1: 2})
+        # Un número repetido no vuelve a contar
+        self.assertEqual(evaluator.draw(17), {})
+
+    def test_remaining_reaches_zero_on_win(self):
+        evaluator = DrawEvaluator({1: CARD}, "classic")
+        for number in CARD[0]:
+            evaluator.draw(number)
+        self.assertEqual(evaluator.remaining[1], 0)
+        self.assertTrue(is_win(evaluator.masks[1], "classic"))
+
+    def test_remaining_matches_cells_to_win(self):
+        rng = random.Random(3)
+        for pattern_set in PATTERN_SETS:
+            evaluator = DrawEvaluator({1: CARD}, pattern_set)
+            drawn = []
+            for number in rng.sample(range(1, 76), 40):
+                evaluator.draw(number)
+                drawn.append(number)
+                self.assertEqual(
+                    evaluator.remaining[1],
+                    cells_to_win(marked_mask(CARD, drawn), pattern_set),
+                )
+
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.user = User.objects.create_user(username="cached", password="secret")
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CachedJWTAuthentication()
+
+    def test_cached_user_has_no_password(self):
+        self.assertEqual(self.auth.get_user(self.token).pk, self.user.pk)
+        version = caching.get_version(caching.user_version_key("id", self.user.pk))
+        key = caching.user_key("id", self.user.pk, version)
+        cached = caches["default"].get(key)
+        self.assertEqual(cached["username"], "cached")
+        self.assertNotIn("password", cached)
+
+    def test_deactivated_user_is_rejected(self):
+        self.auth.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+
+    @mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True)
+    def test_revoke_check_still_applies(self):
+        token = AccessToken.for_user(self.user)
+        self.auth.get_user(token)
+        self.user.set_password("changed")
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(token)
+
+
+
+class StandingsViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="standing")
+        self.tournament = Tournament.objects.create(name="Copa")
+        TournamentEntry.objects.create(tournament=self.tournament, user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def url(self, pk, action="standings"):
+        return f"/api/games/tournaments/{pk}/{action}/"
+
+    def test_standings(self):
+        response = self.client.get(self.url(self.tournament.id), {"limit": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["user__username"], "standing")
+
+    def test_invalid_limit(self):
+        for limit in ("-1", "0", "abc"):
+            response = self.client.get(self.url(self.tournament.id), {"limit": limit})
+            self.assertEqual(response.status_code, 400)
+
+    def test_unknown_tournament(self):
+        for pk in ("abc", self.tournament.id + 1):
+            self.assertEqual(self.client.get(self.url(pk)).status_code, 404)
+            self.assertEqual(self.client.get(self.url(pk, "entry")).status_code, 404)
@@ -0,0 +1,215 @@
+"""
+Tournament mode: many rooms (regular Game rows) sharing one draw schedule.
+
+Every room of a tournament sees the same numbers in the same order, so a
+single scheduler draws for all of them with one UPDATE per tick, and the
+results of each room feed the tournament standings as they happen.
+"""
+
+import asyncio
+import logging
+import random
+from channels.db import database_sync_to_async
+from django.db import transaction
+from django.db.models import F, Func, Subquery
+from django.utils import timezone
+from .caching import invalidate_game
+from .draws import BINGO_NUMBERS, DRAW_INTERVAL, array_append
+from .events import encoded_event
+from .lobby import invalidate_lobby
+from .models import Game, PlayerCard, Tournament, TournamentEntry
+from .patterns import DrawEvaluator
+from .session import card_group_name
+from .view_utils import generate_bingo_card
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 2000
+
+
+def start_tournament(tournament_id):
+    """Create the rooms and spread the registered players across them."""
+    with transaction.atomic():
+        tournament = Tournament.objects.select_for_update().get(id=tournament_id)
+        if tournament.status != "registering":
+            raise ValueError("Tournament already started")
+
+        entries = list(
+            tournament.entries.order_by("id").values_list("id", "user_id")
+        )
+        if not entries:
+            raise ValueError("Tournament has no players")
+        if tournament.room_size < 1:
+            raise ValueError("Room size must be at least 1")
+
+        room_count = -(-len(entries) // tournament.room_size)
+        rooms = Game.objects.bulk_create(
+            [
+                Game(
+                    tournament=tournament,
+                    status="playing",
+                    pattern_set=tournament.pattern_set,
+                )
+                for _ in range(room_count)
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        # Reparto round-robin para que las salas queden del mismo tamaño
+        cards, assigned = [], []
+        for i, (entry_id, user_id) in enumerate(entries):
+            room = rooms[i % room_count]
+            cards.append(
+                PlayerCard(
+                    user_id=user_id, game=room, card_numbers=generate_bingo_card()
+                )
+            )
+            assigned.append(TournamentEntry(id=entry_id, game=room))
+        PlayerCard.objects.bulk_create(cards, batch_size=BULK_BATCH_SIZE)
+        TournamentEntry.objects.bulk_update(
+            assigned, ["game"], batch_size=BULK_BATCH_SIZE
+        )
+
+        tournament.status = "running"
+        tournament.room_count = room_count
+        tournament.starts_at = timezone.now()
+        tournament.save(update_fields=["status", "room_count", "starts_at"])
+        return tournament
+
+
+def get_standings(tournament_id, limit=100):
+    return list(
+        TournamentEntry.objects.filter(tournament_id=tournament_id)
+        .order_by("-wins", F("draws_to_win").asc(nulls_last=True), "id")
+        .values("user__username", "wins", "draws_to_win", "game_id")[:limit]
+    )
+
+
+def record_room_result(game_id, user_id):
+    """Add a room win to the standings; called once per finished room."""
+    room = Game.objects.filter(id=game_id).values("tournament_id").first()
+    if not room or room["tournament_id"] is None:
+        return
+    tournament_id = room["tournament_id"]
+
+    draws = Game.objects.filter(id=game_id).annotate(
+        draws=Func(F("drawn_numbers"), function="cardinality")
+    )
+    TournamentEntry.objects.filter(tournament_id=tournament_id, user_id=user_id).update(
+        wins=F("wins") + 1,
+        draws_to_win=Subquery(draws.values("draws")[:1]),
+        finished_at=timezone.now(),
+    )
+    Tournament.objects.filter(id=tournament_id).update(
+        rooms_finished=F("rooms_finished") + 1
+    )
+
+
+@database_sync_to_async
+def load_tournament(tournament_id):
+    tournament = Tournament.objects.get(id=tournament_id)
+    cards = list(
+        PlayerCard.objects.filter(game__tournament_id=tournament_id).values_list(
+            "id", "game_id", "card_numbers"
+        )
+    )
+    return tournament, cards
+
+
+@database_sync_to_async
+def save_tournament_draw(tournament_id, number):
+    """Append the number to the tournament and its open rooms; return those rooms."""
+    Tournament.objects.filter(id=tournament_id).update(
+        drawn_numbers=array_append("drawn_numbers", number)
+    )
+    rooms = Game.objects.filter(tournament_id=tournament_id, status="playing")
+    rooms.update(
+        drawn_numbers=array_append("drawn_numbers", number), current_number=number
+    )
+    return list(rooms.values_list("id", flat=True))
+
+
+@database_sync_to_async
+def finish_tournament(tournament_id):
+    """Close the tournament and its open rooms; return the rooms closed here."""
+    with transaction.atomic():
+        # Bloquear las salas para que un bingo simultáneo llegue tarde y no
+        # se cierre la misma sala dos veces
+        rooms = list(
+            Game.objects.select_for_update()
+            .filter(tournament_id=tournament_id, status="playing")
+            .values_list("id", flat=True)
+        )
+        Game.objects.filter(id__in=rooms).update(status="finished")
+        Tournament.objects.filter(id=tournament_id).update(status="finished")
+    for game_id in rooms:
+        invalidate_lobby(game_id)
+        invalidate_game(game_id)
+    return rooms
+
+
+class TournamentScheduler:
+    def __init__(
+        self, tournament_id, channel_layer, interval=DRAW_INTERVAL, end_room=None
+    ):
+        self.tournament_id = tournament_id
+        self.channel_layer = channel_layer
+        self.interval = interval
+        # Corrutina que desmonta una sala (game_over y cierre de sockets)
+        self.end_room = end_room
+        self.card_rooms = {}
+        self.evaluator = None
+
+    async def load(self):
+        tournament, rows = await load_tournament(self.tournament_id)
+        cards = {}
+        for card_id, game_id, card_numbers in rows:
+            cards[card_id] = card_numbers
+            self.card_rooms[card_id] = game_id
+
+        # Un solo evaluador para todas las salas del torneo
+        self.evaluator = DrawEvaluator(cards, tournament.pattern_set)
+        for number in tournament.drawn_numbers:
+            self.evaluator.draw(number)
+        return set(BINGO_NUMBERS) - set(tournament.drawn_numbers)
+
+    async def draw(self, number):
+        rooms = await save_tournament_draw(self.tournament_id, number)
+
+        drawn_event = encoded_event("number_drawn", number=number)
+        for game_id in rooms:
+            await self.channel_layer.group_send(f"game_{game_id}", drawn_event)
+
+        open_rooms = set(rooms)
+        for card_id, remaining in self.evaluator.draw(number).items():
+            if self.card_rooms[card_id] in open_rooms:
+                await self.channel_layer.group_send(
+                    card_group_name(card_id),
+                    encoded_event("win_hint", remaining=remaining),
+                )
+        return rooms
+
+    async def finish(self):
+        # Las salas sin ganador terminan junto con el torneo
+        rooms = await finish_tournament(self.tournament_id)
+        if self.end_room is not None:
+            for game_id in rooms:
+                await self.end_room(game_id)
+        logger.info(f"Tournament {self.tournament_id} finished")
+
+    async def run(self):
+        try:
+            available_numbers = await self.load()
+            while available_numbers:
+                await asyncio.sleep(self.interval)
+
+                number = random.choice(list(available_numbers))
+                available_numbers.remove(number)
+                if not await self.draw(number):
+                    break
+            await self.finish()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error running tournament {self.tournament_id}: {str(e)}")
@@ -4,6 +4,7 @@ from . import views
 
 router = DefaultRouter()
 router.register(r"games", views.GameViewSet, basename="game")
+router.register(r"tournaments", views.TournamentViewSet, basename="tournament")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -1,8 +1,58 @@
+import random
+from django.db import transaction
 from django.utils import timezone
 from games.models import Game
+from games.caching import invalidate_game
+from games.lobby import invalidate_lobby
 
 
 def cancel_old_games():
-    return Game.objects.filter(
+    old_games = Game.objects.filter(
         status="waiting", created_at__lt=timezone.now() - timezone.timedelta(minutes=1)
-    ).update(status="cancelled")
+    )
+    game_ids = list(old_games.values_list("id", flat=True))
+    if not game_ids:
+        return 0
+
+    cancelled = Game.objects.filter(id__in=game_ids, status="waiting").update(
+        status="cancelled"
+    )
+    transaction.on_commit(lambda: invalidate_games(game_ids))
+    return cancelled
+
+
+def invalidate_games(game_ids):
+    for game_id in game_ids:
+        invalidate_game(game_id)
+        invalidate_lobby(game_id)
+
+
+def generate_bingo_card():
+    card = []
+    used_numbers = set()
+
+    ranges = [(1, 15), (16, 30), (31, 45), (46, 60), (61, 75)]
+
+    for col_idx, (start, end) in enumerate(ranges):
+        column = []
+        numbers_needed = (
+            5 if col_idx != 2 else 4
+        )  # La columna del medio necesita solo 4 números
+
+        while len(column) < numbers_needed:
+            num = random.randint(start, end)
+            if num not in used_numbers:
+                used_numbers.add(num)
+                column.append(num)
+
+        # Mezclar los números en la columna
+        random.shuffle(column)
+
+        # Si es la columna del medio (N), insertar el comodín en el centro
+        if col_idx == 2:
+            column.insert(2, 0)  # Usamos 0 como marcador del comodín
+
+        card.append(column)
+
+    # Transponer la matriz para obtener filas en lugar de columnas
+    return [list(row) for row in zip(*card)]
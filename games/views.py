@@ -1,14 +1,33 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from games.models import Game, PlayerCard
-from games.serializers import GameSerializer
-import random
-
-from games.view_utils import cancel_old_games
+from games.models import Game, PlayerCard, Tournament, TournamentEntry
+from games.serializers import (
+    GameSerializer,
+    TournamentEntrySerializer,
+    TournamentSerializer,
+)
+
+from games.view_utils import cancel_old_games, generate_bingo_card
+from games.patterns import DEFAULT_PATTERN_SET, PATTERN_SETS
+from games.tournaments import get_standings, start_tournament
+from games.lobby import get_lobby_snapshot, refresh_lobby
+from games.sharding import get_coordinator
+from games.export import (
+    EXPORT_FORMATS,
+    aiter_export,
+    export_queryset,
+    iter_export,
+    parse_export_filters,
+)
 
 
 class GameViewSet(viewsets.ModelViewSet):
@@ -18,14 +37,23 @@ class GameViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"])
     def join_game(self, request):
+        pattern_set = request.data.get("pattern_set", DEFAULT_PATTERN_SET)
+        if pattern_set not in PATTERN_SETS:
+            return Response(
+                {"error": f"pattern_set must be one of {list(PATTERN_SETS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         with transaction.atomic():
             # Cancel any previous games that has been waiting for too long
             cancel_old_games()
 
             # Find an available game or create a new one
-            game = Game.objects.filter(status="waiting").first()
+            game = Game.objects.filter(status="waiting", pattern_set=pattern_set).first()
             if not game:
-                game = Game.objects.create(created_at=timezone.now())
+                game = Game.objects.create(
+                    created_at=timezone.now(), pattern_set=pattern_set
+                )
 
             if not PlayerCard.objects.filter(user=request.user, game=game).exists():
                 card_numbers = self.generate_bingo_card()
@@ -34,38 +62,131 @@ class GameViewSet(viewsets.ModelViewSet):
                     user=request.user, game=game, card_numbers=card_numbers
                 )
 
+                # Invalidar recién al confirmar: antes, una consulta del lobby
+                # volvería a guardar el conteo sin este jugador
+                transaction.on_commit(lambda: refresh_lobby(game.id))
+
             serializer = self.get_serializer(game)
             response_data = serializer.data
             response_data["created_at"] = game.created_at.timestamp()
 
             return Response(response_data)
 
-    def generate_bingo_card(self):
-        card = []
-        used_numbers = set()
-
-        ranges = [(1, 15), (16, 30), (31, 45), (46, 60), (61, 75)]
+    @action(detail=True, methods=["get"])
+    def lobby(self, request, pk=None):
+        try:
+            game_id = int(pk)
+        except (TypeError, ValueError):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        snapshot = get_lobby_snapshot(game_id)
+        if snapshot is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(snapshot)
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        fmt = request.query_params.get("export_format", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"export_format must be one of {EXPORT_FORMATS}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            filters = parse_export_filters(
+                status=request.query_params.get("status"),
+                since=request.query_params.get("since"),
+                until=request.query_params.get("until"),
+            )
+            queryset = export_queryset(**filters)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Django materializa el iterador que no corresponde al handler, así que
+        # bajo ASGI va el asíncrono y bajo WSGI el síncrono
+        rows = (
+            aiter_export(queryset, fmt)
+            if isinstance(request._request, ASGIRequest)
+            else iter_export(queryset, fmt)
+        )
+        response = StreamingHttpResponse(
+            rows,
+            content_type="text/csv" if fmt == "csv" else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="games.{fmt}"'
+        return response
 
-        for col_idx, (start, end) in enumerate(ranges):
-            column = []
-            numbers_needed = (
-                5 if col_idx != 2 else 4
-            )  # La columna del medio necesita solo 4 números
-
-            while len(column) < numbers_needed:
-                num = random.randint(start, end)
-                if num not in used_numbers:
-                    used_numbers.add(num)
-                    column.append(num)
-
-            # Mezclar los números en la columna
-            random.shuffle(column)
-
-            # Si es la columna del medio (N), insertar el comodín en el centro
-            if col_idx == 2:
-                column.insert(2, 0)  # Usamos 0 como marcador del comodín
+    def generate_bingo_card(self):
+        return generate_bingo_card()
 
-            card.append(column)
+class TournamentViewSet(viewsets.ModelViewSet):
+    queryset = Tournament.objects.all()
+    serializer_class = TournamentSerializer
+    permission_classes = [IsAuthenticated]
 
-        # Transponer la matriz para obtener filas en lugar de columnas
-        return [list(row) for row in zip(*card)]
+    def get_permissions(self):
+        if self.action in ("register", "entry", "standings", "list", "retrieve"):
+            return [IsAuthenticated()]
+        return [IsAdminUser()]
+
+    @action(detail=True, methods=["post"])
+    def register(self, request, pk=None):
+        tournament = self.get_object()
+        if tournament.status != "registering":
+            return Response(
+                {"error": "Registration is closed"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        entry, _ = TournamentEntry.objects.get_or_create(
+            tournament=tournament, user=request.user
+        )
+        return Response(TournamentEntrySerializer(entry).data)
+
+    @action(detail=True, methods=["get"])
+    def entry(self, request, pk=None):
+        try:
+            tournament_id = int(pk)
+        except (TypeError, ValueError):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        entry = TournamentEntry.objects.filter(
+            tournament_id=tournament_id, user=request.user
+        ).first()
+        if not entry:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(TournamentEntrySerializer(entry).data)
+
+    @action(detail=True, methods=["post"])
+    def start(self, request, pk=None):
+        try:
+            tournament_id = int(pk)
+        except (TypeError, ValueError):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        try:
+            tournament = start_tournament(tournament_id)
+        except Tournament.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Arrancar el scheduler en el worker dueño sin esperar al heartbeat
+        coordinator = get_coordinator()
+        async_to_sync(coordinator.ensure_started)(get_channel_layer())
+        async_to_sync(coordinator.route_start_tournament)(tournament.id)
+        return Response(self.get_serializer(tournament).data)
+
+    @action(detail=True, methods=["get"])
+    def standings(self, request, pk=None):
+        try:
+            tournament_id = int(pk)
+        except (TypeError, ValueError):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = int(request.query_params.get("limit", 100))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response(
+                {"error": "limit must be a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not Tournament.objects.filter(id=tournament_id).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(get_standings(tournament_id, min(limit, 1000)))
@@ -4,18 +4,26 @@ ASGI config for bingo project.
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from channels.security.websocket import AllowedHostsOriginValidator
-from games.routing import websocket_urlpatterns
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings.settings")
 
+# Django has to be set up before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
+from django.apps import apps  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+from games.routing import websocket_urlpatterns  # noqa: E402
+
+websocket_app = URLRouter(websocket_urlpatterns)
+if apps.is_installed("django.contrib.sessions"):
+    from channels.auth import AuthMiddlewareStack
+
+    websocket_app = AuthMiddlewareStack(websocket_app)
+
 application = ProtocolTypeRouter(
     {
-        "http": get_asgi_application(),
-        "websocket": AllowedHostsOriginValidator(
-            AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
-        ),
+        "http": django_asgi_app,
+        "websocket": AllowedHostsOriginValidator(websocket_app),
     }
 )
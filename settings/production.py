@@ -0,0 +1,38 @@
+"""
+Production profile for the API and socket workers.
+
+Only the apps the REST API and the Daphne workers actually use are
+installed, and DEBUG is off so Django doesn't keep every SQL query in
+memory. Use it with DJANGO_SETTINGS_MODULE=settings.production.
+"""
+
+import os
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "*").split(",")
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "rest_framework_simplejwt.token_blacklist",
+    "rest_framework",
+    "corsheaders",
+    "channels",
+    "users",
+    "games",
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+}
@@ -65,6 +65,24 @@ CHANNEL_LAYERS = {
     "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
 }
 
+# Local-memory LRU: LocMemCache evicts the least recently used entries
+# once MAX_ENTRIES is reached. SHARED_CACHE_URL adds a Redis tier shared by
+# every worker (see games/caching.py).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bingo",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 50000, "CULL_FREQUENCY": 10},
+    }
+}
+
+if os.getenv("SHARED_CACHE_URL"):
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("SHARED_CACHE_URL"),
+    }
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -73,6 +91,9 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "123456"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # database_sync_to_async cierra las conexiones vencidas en cada salto;
+        # con 0 cada consulta de un consumer abría una conexión nueva
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
     }
 }
 
@@ -110,7 +131,7 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
 }
 
@@ -122,3 +143,14 @@ SIMPLE_JWT = {
 CHANNEL_LAYERS = {
     "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
 }
+
+# Ownership of games across Daphne workers (see games/sharding.py). Use
+# "games.sharding.AdvisoryLockLeaseBackend" when running several workers.
+BINGO_SHARDING = {
+    "BACKEND": os.getenv(
+        "BINGO_SHARDING_BACKEND", "games.sharding.LocalLeaseBackend"
+    ),
+    "WORKER_ID": os.getenv("BINGO_WORKER_ID"),
+    "HEARTBEAT_INTERVAL": 5,
+    "LEASE_TTL": 15,
+}
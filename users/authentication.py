@@ -0,0 +1,29 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from games.caching import get_user
+
+
+class CachedUserLookup:
+    """
+    Stands in for the user model inside JWTAuthentication.get_user, which
+    only calls ``objects.get(**{USER_ID_FIELD: value})``. The upstream
+    checks (inactive users, CHECK_REVOKE_TOKEN) run unchanged on the result.
+    """
+
+    def __init__(self, user_model):
+        self.DoesNotExist = user_model.DoesNotExist
+        self.objects = self
+
+    def get(self, **lookup):
+        ((field, value),) = lookup.items()
+        user = get_user(value, field)
+        if user is None:
+            raise self.DoesNotExist
+        return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that loads the user through the read-through cache."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user_model = CachedUserLookup(self.user_model)